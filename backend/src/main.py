@@ -1,11 +1,26 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse, Response
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+import asyncio
 from fastapi.staticfiles import StaticFiles
+from collections import deque
+from itertools import islice
 from pathlib import Path
 from pydantic import BaseModel
+import json
+import sys
 import time
 import logging
 
+ROOT_DIR = Path(__file__).resolve().parents[2]  # ~/urbanii
+sys.path.insert(0, str(ROOT_DIR))
+
+from scenes import SCENES  # noqa: E402 — needs ROOT_DIR on sys.path
+
+try:
+    import msgpack
+except ImportError:  # optional — JSON uploads still work without it
+    msgpack = None
+
 # -----------------------------------------------------------------------------
 # App + logging
 # -----------------------------------------------------------------------------
@@ -15,26 +30,15 @@ logging.basicConfig(level=logging.INFO)
 log = logging.getLogger("urbanii-backend")
 
 # -----------------------------------------------------------------------------
-# Scene configuration (authoritative list)
+# Scene configuration (authoritative list lives in scenes.py)
 # -----------------------------------------------------------------------------
 
-SCENES = {
-    "shibuya": {
-        "label": "Shibuya Crossing",
-        "type": "youtube",
-    },
-    "industrial": {
-        "label": "Industrial Yard",
-        "type": "hls",
-    },
-    "highway": {
-        "label": "Highway Traffic",
-        "type": "hls",
-    },
-}
-
 ACTIVE_SCENE = "shibuya"
 
+# Pulsed (set + immediately cleared) on every switch to wake all
+# /scene/stream subscribers at once.
+scene_event = asyncio.Event()
+
 # -----------------------------------------------------------------------------
 # Models
 # -----------------------------------------------------------------------------
@@ -46,21 +50,79 @@ class SceneSwitchRequest(BaseModel):
 # In-memory state (ephemeral by design)
 # -----------------------------------------------------------------------------
 
-last_video_frame: bytes | None = None
-events: list[dict] = []
+# The latest annotated JPEG is double-buffered: writers fill the slot the
+# head does not point at, then publish by swapping the head index (a single
+# atomic int assignment), so readers never observe a half-written frame and
+# uploads never contend with dashboard polls.
+FRAME_SLOTS: list[bytes | None] = [None, None]
+FRAME_HEAD = 0
+
+# Pulsed on every published frame to wake the MJPEG stream generators.
+video_event = asyncio.Event()
+
+# Live MJPEG subscribers. Published to the inference node (via /scene and
+# /scene/stream) so it can skip JPEG encoding when nobody is watching.
+VIDEO_CLIENTS = 0
 
 MAX_EVENTS = 500
 
+# deque(maxlen=...) evicts the oldest event in O(1); a list.pop(0) here
+# memmoved up to MAX_EVENTS pointers on every frame once full.
+events: deque[dict] = deque(maxlen=MAX_EVENTS)
+
+# Pulsed on every stored event to wake /ws/events subscribers.
+events_event = asyncio.Event()
+
+
+def publish_video_frame(buf: bytes):
+    global FRAME_HEAD
+    slot = 1 - FRAME_HEAD
+    FRAME_SLOTS[slot] = buf
+    FRAME_HEAD = slot
+
+    video_event.set()
+    video_event.clear()
+
+
+def current_video_frame() -> bytes | None:
+    return FRAME_SLOTS[FRAME_HEAD]
+
+
+def clear_video_frames():
+    FRAME_SLOTS[0] = None
+    FRAME_SLOTS[1] = None
+
 # -----------------------------------------------------------------------------
 # Scene management
 # -----------------------------------------------------------------------------
 
+def scene_state() -> dict:
+    return {"scene": ACTIVE_SCENE, "video_clients": VIDEO_CLIENTS}
+
+
+def notify_scene_watchers():
+    # set() releases every current waiter; clearing right after re-arms
+    # the event for the next change
+    scene_event.set()
+    scene_event.clear()
+
+
+def scene_etag() -> str:
+    # The state is just (scene, viewer count) — string it into a strong
+    # ETag so unchanged polls can be answered with an empty 304.
+    return f'"{ACTIVE_SCENE}:{VIDEO_CLIENTS}"'
+
+
 @app.get("/scene")
-def get_active_scene():
+def get_active_scene(request: Request):
     """
-    Used by inference node to poll current scene.
+    Used by inference node to poll current scene. Honors If-None-Match,
+    so a steady-state poll costs a bodiless 304 instead of JSON.
     """
-    return {"scene": ACTIVE_SCENE}
+    etag = scene_etag()
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(scene_state(), headers={"ETag": etag})
 
 
 @app.get("/scenes")
@@ -74,13 +136,32 @@ def list_scenes():
     }
 
 
+@app.get("/scene/stream")
+async def stream_scene():
+    """
+    Server-sent events: emits the active scene and viewer count
+    immediately, then again on every change, so the inference node can
+    hold one connection instead of polling. Re-emits every 15s as a
+    keep-alive.
+    """
+    async def gen():
+        while True:
+            yield f"data: {json.dumps(scene_state())}\n\n"
+            try:
+                await asyncio.wait_for(scene_event.wait(), timeout=15.0)
+            except asyncio.TimeoutError:
+                pass
+
+    return StreamingResponse(gen(), media_type="text/event-stream")
+
+
 @app.post("/scenes/switch")
-def switch_scene(payload: SceneSwitchRequest):
+async def switch_scene(payload: SceneSwitchRequest):
     """
     Switch active scene.
     Clears events and video frame to prevent cross-scene bleed.
     """
-    global ACTIVE_SCENE, last_video_frame
+    global ACTIVE_SCENE
 
     if payload.scene not in SCENES:
         log.error(f"Scene switch failed — unknown scene: {payload.scene}")
@@ -97,7 +178,9 @@ def switch_scene(payload: SceneSwitchRequest):
 
     ACTIVE_SCENE = payload.scene
     events.clear()
-    last_video_frame = None
+    clear_video_frames()
+
+    notify_scene_watchers()
 
     log.info(f"🔁 Scene switched → {ACTIVE_SCENE}")
 
@@ -110,28 +193,80 @@ def switch_scene(payload: SceneSwitchRequest):
 # Detection metadata (JSON only)
 # -----------------------------------------------------------------------------
 
-@app.post("/frame")
-async def receive_frame(payload: dict):
+def record_event(payload: dict):
     """
-    Receives detection metadata from inference node.
+    Stamp and store one detection event.
     """
     payload["received_at"] = time.time()
     payload["scene"] = ACTIVE_SCENE
 
     events.append(payload)
 
-    if len(events) > MAX_EVENTS:
-        events.pop(0)
+    events_event.set()
+    events_event.clear()
+
+
+@app.post("/frame")
+async def receive_frame(request: Request):
+    """
+    Receives detection metadata from inference node.
+    Accepts msgpack (preferred — binary floats, no ASCII round-trip)
+    or plain JSON.
+    """
+    raw = await request.body()
+
+    if msgpack is not None and "msgpack" in request.headers.get("content-type", ""):
+        record_event(msgpack.unpackb(raw, raw=False))
+    else:
+        record_event(json.loads(raw))
 
     return {"status": "ok"}
 
 
+@app.websocket("/ws/frame")
+async def receive_frame_ws(ws: WebSocket):
+    """
+    Persistent channel for detection metadata — one connection for the
+    whole inference session instead of one HTTP request per frame.
+    Binary messages are msgpack, text messages are JSON.
+    """
+    await ws.accept()
+    try:
+        while True:
+            msg = await ws.receive()
+            if msg["type"] == "websocket.disconnect":
+                break
+            if msg.get("bytes") is not None and msgpack is not None:
+                record_event(msgpack.unpackb(msg["bytes"], raw=False))
+            elif msg.get("text") is not None:
+                record_event(json.loads(msg["text"]))
+    except WebSocketDisconnect:
+        pass
+
+
 @app.get("/events")
 def get_events(limit: int = 20):
     """
-    Dashboard polling endpoint.
+    Dashboard polling endpoint (fallback when WebSocket is unavailable).
+    """
+    return JSONResponse(list(islice(reversed(events), limit)))
+
+
+@app.websocket("/ws/events")
+async def stream_events_ws(ws: WebSocket):
+    """
+    Pushes the latest event window to dashboard clients whenever new
+    events arrive — no request per refresh. The 1s sleep caps the push
+    rate at UI cadence and coalesces frame bursts into one message.
     """
-    return JSONResponse(events[-limit:][::-1])
+    await ws.accept()
+    try:
+        while True:
+            await ws.send_json(list(islice(reversed(events), 20)))
+            await asyncio.sleep(1.0)
+            await events_event.wait()
+    except WebSocketDisconnect:
+        pass
 
 # -----------------------------------------------------------------------------
 # Video frame transport (JPEG bytes)
@@ -142,19 +277,55 @@ async def upload_video_frame(request: Request):
     """
     Receives latest annotated JPEG frame from inference.
     """
-    global last_video_frame
-    last_video_frame = await request.body()
+    publish_video_frame(await request.body())
     return {"status": "ok"}
 
 
+@app.websocket("/ws/video")
+async def upload_video_frame_ws(ws: WebSocket):
+    """
+    Persistent channel for annotated JPEG frames — avoids per-frame HTTP
+    framing and routing at ~30 FPS.
+    """
+    await ws.accept()
+    try:
+        while True:
+            publish_video_frame(await ws.receive_bytes())
+    except WebSocketDisconnect:
+        pass
+
+
 @app.get("/video")
-def get_video():
+async def get_video():
     """
-    Dashboard <img src="/video"> endpoint.
+    Dashboard <img src="/video"> endpoint — a multipart MJPEG stream, so
+    one connection carries every frame instead of the browser polling a
+    fresh request per image. The generator sleeps on video_event and is
+    woken exactly when a new frame is published.
     """
-    if last_video_frame is None:
-        return Response(status_code=204)
-    return Response(content=last_video_frame, media_type="image/jpeg")
+    async def gen():
+        global VIDEO_CLIENTS
+        VIDEO_CLIENTS += 1
+        notify_scene_watchers()
+        try:
+            while True:
+                frame = current_video_frame()
+                if frame is not None:
+                    yield (
+                        b"--frame\r\nContent-Type: image/jpeg\r\n"
+                        + f"Content-Length: {len(frame)}\r\n\r\n".encode()
+                        + frame
+                        + b"\r\n"
+                    )
+                await video_event.wait()
+        finally:
+            VIDEO_CLIENTS -= 1
+            notify_scene_watchers()
+
+    return StreamingResponse(
+        gen(),
+        media_type="multipart/x-mixed-replace; boundary=frame",
+    )
 
 # -----------------------------------------------------------------------------
 # Health / liveness
@@ -166,14 +337,13 @@ def health():
         "status": "ok",
         "active_scene": ACTIVE_SCENE,
         "events": len(events),
-        "has_video": last_video_frame is not None,
+        "has_video": current_video_frame() is not None,
     }
 
 # -----------------------------------------------------------------------------
 # Dashboard mount
 # -----------------------------------------------------------------------------
 
-ROOT_DIR = Path(__file__).resolve().parents[2]  # ~/urbanii
 DASHBOARD_DIR = ROOT_DIR / "dashboard"
 
 if DASHBOARD_DIR.exists():
@@ -155,18 +155,19 @@ function updateTrafficMeter(traffic) {
 
 /* ================= VIDEO ================= */
 
-function refreshVideo() {
-  const img = new Image();
-  img.onload = () => {
-    videoFeed.src = img.src;
+/* /video is a multipart MJPEG stream now — the browser keeps one
+   connection open and swaps frames itself, no polling needed. */
+function connectVideo() {
+  videoFeed.onload = () => {
     videoError.classList.add("hidden");
     setStatus(true);
   };
-  img.onerror = () => {
+  videoFeed.onerror = () => {
     videoError.classList.remove("hidden");
     setStatus(false);
+    setTimeout(connectVideo, 2000);
   };
-  img.src = `/video?cache=${Date.now()}`;
+  videoFeed.src = `/video?cache=${Date.now()}`;
 }
 
 /* ================= EVENTS ================= */
@@ -174,7 +175,11 @@ function refreshVideo() {
 function refreshEvents() {
   fetch("/events?limit=20")
     .then(r => r.json())
-    .then(events => {
+    .then(renderEvents)
+    .catch(err => console.error("Failed to refresh events", err));
+}
+
+function renderEvents(events) {
       eventsBody.innerHTML = "";
 
       let classTotals = {};
@@ -265,9 +270,32 @@ function refreshEvents() {
         shouldShow ? showIndustrialAlert(industrialIntel) : hideIndustrialAlert();
       } else {
         hideIndustrialAlert() ;
-      }    
-    })
-    .catch(err => console.error("Failed to refresh events", err));
+      }
+}
+
+/* Server pushes event batches over a WebSocket; if the socket drops we
+   fall back to polling until it reconnects. */
+let eventsPollTimer = null;
+
+function connectEvents() {
+  const proto = location.protocol === "https:" ? "wss" : "ws";
+  const ws = new WebSocket(`${proto}://${location.host}/ws/events`);
+
+  ws.onopen = () => {
+    if (eventsPollTimer) {
+      clearInterval(eventsPollTimer);
+      eventsPollTimer = null;
+    }
+  };
+
+  ws.onmessage = msg => renderEvents(JSON.parse(msg.data));
+
+  ws.onclose = () => {
+    if (!eventsPollTimer) {
+      eventsPollTimer = setInterval(refreshEvents, 1000);
+    }
+    setTimeout(connectEvents, 3000);
+  };
 }
 
 /* ================= SCENES ================= */
@@ -315,6 +343,6 @@ resetBtn.onclick = () => {
 
 /* ================= LOOP ================= */
 
-setInterval(refreshVideo, 500);
-setInterval(refreshEvents, 1000);
+connectVideo();
+connectEvents();
 loadScenes();
@@ -1,12 +1,15 @@
-from collections import deque
+import numpy as np
+
+from intelligence.trend import TrendWindow
+
 
 class CrowdAnalyzer:
     """
     Computes crowd density & trend for pedestrian-heavy scenes (e.g. Shibuya).
     """
 
-    def __init__(self, history_size=30):
-        self.history = deque(maxlen=history_size)
+    def __init__(self):
+        self._trend = TrendWindow()
 
     def analyze(self, detections, frame_width):
         """
@@ -22,16 +25,21 @@ class CrowdAnalyzer:
         # ----------------------------
         zones = {"left": 0, "center": 0, "right": 0}
 
-        for p in persons:
-            x1, _, x2, _ = p["bbox"]
-            cx = (x1 + x2) / 2
+        if persons:
+            bb = np.fromiter(
+                (x for p in persons for x in p["bbox"]),
+                dtype=np.float32,
+                count=4 * count,
+            ).reshape(-1, 4)
+            cx = (bb[:, 0] + bb[:, 2]) * 0.5
+
+            # Bucket every centroid in one pass instead of branching per person
+            idx = (cx > frame_width * 0.33).astype(int) + (cx > frame_width * 0.66)
+            counts = np.bincount(idx, minlength=3)
 
-            if cx < frame_width * 0.33:
-                zones["left"] += 1
-            elif cx < frame_width * 0.66:
-                zones["center"] += 1
-            else:
-                zones["right"] += 1
+            zones["left"] = int(counts[0])
+            zones["center"] = int(counts[1])
+            zones["right"] = int(counts[2])
 
         # ----------------------------
         # Density classification
@@ -53,16 +61,8 @@ class CrowdAnalyzer:
 
         # Only track history when there is a meaningful crowd
         if count >= 3:
-            self.history.append(count)
-
-            if len(self.history) >= 6:
-                avg_recent = sum(list(self.history)[-3:]) / 3
-                avg_earlier = sum(list(self.history)[-6:-3]) / 3
-
-                if avg_recent > avg_earlier * 1.2:
-                    trend = "increasing"
-                elif avg_recent < avg_earlier * 0.8:
-                    trend = "decreasing"
+            self._trend.push(count)
+            trend = self._trend.trend()
 
         return {
             "count": count,
@@ -1,5 +1,5 @@
 # ~/urbanii/inference/intelligence/highway.py
-from collections import deque
+from intelligence.trend import TrendWindow
 
 VEHICLE_CLASSES = {"car", "truck", "bus", "motorbike"}
 
@@ -8,15 +8,15 @@ class HighwayAnalyzer:
     Traffic density + simple safety signals (no tracking).
     Demo-safe: runs on per-frame aggregates.
     """
-    def __init__(self, history_size=30):
-        self.history = deque(maxlen=history_size)
+    def __init__(self):
+        self._trend = TrendWindow()
 
     def analyze(self, detections, frame_height):
         vehicles = [d for d in detections if d.get("class_name") in VEHICLE_CLASSES]
         persons  = [d for d in detections if d.get("class_name") == "person"]
 
         vehicle_count = len(vehicles)
-        self.history.append(vehicle_count)
+        self._trend.push(vehicle_count)
 
         # Density (tune later using real video)
         if vehicle_count < 6:
@@ -27,15 +27,7 @@ class HighwayAnalyzer:
             density = "high"
 
         # Trend
-        trend = "stable"
-        if len(self.history) >= 6:
-            history_list = list(self.history)
-            recent = sum(history_list[-3:]) / 3
-            earlier = sum(history_list[-6:-3]) / 3
-            if earlier > 0 and recent > earlier * 1.2:
-                trend = "increasing"
-            elif earlier > 0 and recent < earlier * 0.8:
-                trend = "decreasing"
+        trend = self._trend.trend()
 
         # Safety: pedestrian in roadway zone (lower 40% of frame)
         pedestrian_in_roadway = False
@@ -1,4 +1,4 @@
-from collections import deque
+from intelligence.trend import TrendWindow
 
 VEHICLE_CLASSES = {"car", "truck", "bus", "motorbike", "motorcycle"}
 MACHINE_CLASSES = {"forklift"}  # optional if  model emits it 
@@ -11,8 +11,8 @@ class IndustrialAnalyzer:
     - Simple zone pressure (bottom of frame = operational area)
     - PPE framed as 'verification recommended' in high-risk context
     """
-    def __init__(self, history_size=30, op_zone_start=0.60):
-        self.worker_hist = deque(maxlen=history_size)
+    def __init__(self, op_zone_start=0.60):
+        self._worker_trend = TrendWindow()
         self.op_zone_start = op_zone_start
 
     def analyze(self, detections, frame_height):
@@ -24,17 +24,10 @@ class IndustrialAnalyzer:
         vehicle_count = len(vehicles)
         machine_count = len(machines)
 
-        self.worker_hist.append(worker_count)
+        self._worker_trend.push(worker_count)
 
         # Worker trend
-        trend = "stable"
-        if len(self.worker_hist) >= 6:
-            recent = sum(list(self.worker_hist)[-3:]) / 3
-            earlier = sum(list(self.worker_hist)[-6:-3]) / 3
-            if earlier > 0 and recent > earlier * 1.2:
-                trend = "increasing"
-            elif earlier > 0 and recent < earlier * 0.8:
-                trend = "decreasing"
+        trend = self._worker_trend.trend()
 
         # "Operational zone": bottom portion of frame
         workers_in_op_zone = 0
@@ -3,6 +3,8 @@ from dataclasses import dataclass
 import time
 import math
 
+import numpy as np
+
 
 @dataclass
 class Track:
@@ -42,6 +44,17 @@ class LoiterAnalyzer:
     def _dist(a: tuple[float, float], b: tuple[float, float]) -> float:
         return math.hypot(a[0] - b[0], a[1] - b[1])
 
+    def _new_track(self, c: tuple[float, float], now: float) -> int:
+        tid = self._next_id
+        self._next_id += 1
+        self._tracks[tid] = Track(
+            x=c[0], y=c[1],
+            first_seen=now,
+            last_seen=now,
+            dwell_seconds=0.0,
+        )
+        return tid
+
     def analyze(self, detections: list[dict], now: float | None = None) -> dict:
         now = now or time.time()
 
@@ -61,37 +74,35 @@ class LoiterAnalyzer:
         for tid in stale_ids:
             del self._tracks[tid]
 
-        # greedy nearest matching
-        used_tracks: set[int] = set()
+        # greedy nearest matching — one broadcast builds the full
+        # centroid × track distance matrix, so the per-centroid scan below
+        # only indexes precomputed rows instead of re-running hypot in Python
         assignments: list[tuple[int, tuple[float, float]]] = []
-
-        for c in centroids:
-            best_tid = None
-            best_dist = 1e9
-
-            for tid, tr in self._tracks.items():
-                if tid in used_tracks:
-                    continue
-                d = self._dist((tr.x, tr.y), c)
-                if d < best_dist:
-                    best_dist = d
-                    best_tid = tid
-
-            if best_tid is not None and best_dist <= self.match_radius_px:
-                used_tracks.add(best_tid)
-                assignments.append((best_tid, c))
-            else:
-                # new track
-                tid = self._next_id
-                self._next_id += 1
-                self._tracks[tid] = Track(
-                    x=c[0], y=c[1],
-                    first_seen=now,
-                    last_seen=now,
-                    dwell_seconds=0.0,
-                )
-                used_tracks.add(tid)
-                assignments.append((tid, c))
+        tids = list(self._tracks)
+
+        if centroids and tids:
+            track_pts = np.array(
+                [(self._tracks[t].x, self._tracks[t].y) for t in tids],
+                dtype=np.float32,
+            )
+            cents = np.array(centroids, dtype=np.float32)
+            dist = np.linalg.norm(
+                cents[:, None, :] - track_pts[None, :, :], axis=-1
+            )
+            unused = np.ones(len(tids), dtype=bool)
+
+            for ci, c in enumerate(centroids):
+                row = np.where(unused, dist[ci], np.inf)
+                ti = int(row.argmin())
+
+                if row[ti] <= self.match_radius_px:
+                    unused[ti] = False
+                    assignments.append((tids[ti], c))
+                else:
+                    assignments.append((self._new_track(c, now), c))
+        else:
+            for c in centroids:
+                assignments.append((self._new_track(c, now), c))
 
         # update tracks + dwell
         for tid, c in assignments:
@@ -0,0 +1,49 @@
+class TrendWindow:
+    """
+    O(1) replacement for the deque + slice-and-sum trend check shared by
+    the analyzers. Keeps the last six samples in a fixed ring and
+    maintains running sums for the recent half (last 3) and the earlier
+    half (the 3 before), so classifying the trend allocates nothing and
+    never copies the history.
+    """
+
+    WINDOW = 6
+    HALF = 3
+
+    def __init__(self):
+        self._buf = [0] * self.WINDOW
+        self._idx = 0        # next write position
+        self._count = 0      # samples seen, capped at WINDOW
+        self._recent = 0     # sum of the last HALF samples
+        self._earlier = 0    # sum of the HALF samples before those
+
+    def push(self, value):
+        if self._count >= self.HALF:
+            # oldest "recent" sample shifts into the "earlier" half
+            shifted = self._buf[(self._idx - self.HALF) % self.WINDOW]
+            self._recent -= shifted
+            self._earlier += shifted
+
+        if self._count >= self.WINDOW:
+            # overwritten slot drops out of "earlier" entirely
+            self._earlier -= self._buf[self._idx]
+
+        self._recent += value
+        self._buf[self._idx] = value
+        self._idx = (self._idx + 1) % self.WINDOW
+
+        if self._count < self.WINDOW:
+            self._count += 1
+
+    def trend(self) -> str:
+        """
+        Comparing window sums is equivalent to comparing the averages the
+        analyzers used to compute — both halves hold HALF samples.
+        """
+        if self._count < self.WINDOW:
+            return "stable"
+        if self._earlier > 0 and self._recent > self._earlier * 1.2:
+            return "increasing"
+        if self._earlier > 0 and self._recent < self._earlier * 0.8:
+            return "decreasing"
+        return "stable"
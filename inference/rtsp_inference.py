@@ -1,13 +1,43 @@
 import cv2
+import json
+import numpy as np
+import queue
+import threading
 import time
 import requests
 import subprocess
+import sys
+import torch
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from websockets.sync.client import connect as ws_connect
 from ultralytics import YOLO
+
+try:
+    import msgpack
+except ImportError:  # backend accepts JSON too
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:  # optional — stdlib json is the slow-but-safe fallback
+    orjson = None
+
+try:
+    from turbojpeg import TurboJPEG
+    _turbo = TurboJPEG()
+except Exception:  # optional — 2-4x faster than cv2's libjpeg when present
+    _turbo = None
 from intelligence.crowd import CrowdAnalyzer
 from intelligence.loiter import LoiterAnalyzer
 from intelligence.highway import HighwayAnalyzer
 from intelligence.industrial import IndustrialAnalyzer
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))  # ~/urbanii
+
+from scenes import SCENE_SOURCES  # noqa: E402 — shared with the backend
+
 
 
 # =============================================================================
@@ -19,13 +49,43 @@ BACKEND_URL = "http://localhost:8000"
 FRAME_ENDPOINT = f"{BACKEND_URL}/frame"
 VIDEO_ENDPOINT = f"{BACKEND_URL}/video"
 SCENE_ENDPOINT = f"{BACKEND_URL}/scene"   # authoritative for inference
+SCENE_STREAM_ENDPOINT = f"{BACKEND_URL}/scene/stream"
+
+WS_BACKEND_URL = "ws://localhost:8000"
+WS_FRAME_ENDPOINT = f"{WS_BACKEND_URL}/ws/frame"
+WS_VIDEO_ENDPOINT = f"{WS_BACKEND_URL}/ws/video"
 
 POLL_INTERVAL = 2.0            # seconds
 JPEG_QUALITY = 80
+VIDEO_SIZE = (960, 540)        # dashboard render size — no point encoding more
 MODEL_PATH = "yolov8s.pt"
 
+BOX_COLOR = (0, 200, 0)
+MAX_LABELED_DETECTIONS = 40    # skip text on frames too busy to read it
+
+# FP16 roughly doubles tensor-core throughput and halves weight/activation
+# bandwidth on CUDA, with no measurable mAP loss at this model size.
+USE_HALF = torch.cuda.is_available()
+DEVICE = 0 if torch.cuda.is_available() else "cpu"
+
+# Fixed inference size (multiples of 32, 16:9) so the graph shape never
+# changes frame to frame — a stable shape lets cuDNN/TensorRT reuse one
+# set of specialized kernels instead of re-tuning per call, and keeps the
+# letterbox math constant.
+IMGSZ = (544, 960)
+
+PHASH_HAMMING_MAX = 2          # frames this close count as unchanged
+
 HLS_MAX_AGE = 25 * 60          # 25 minutes (YouTube safety window)
 
+# One keep-alive session for every backend call — opening a fresh TCP
+# connection per frame is pure overhead at 30 FPS. Pool is sized for the
+# concurrent users of the session: the two upload workers, the SSE scene
+# watcher, and the occasional fallback POST.
+SESSION = requests.Session()
+SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+SESSION.headers.update({"Connection": "keep-alive"})
+
 crowd_analyzer = CrowdAnalyzer()
 loiter_analyzer = LoiterAnalyzer(
     loiter_seconds=25.0,        # tweak as needed
@@ -37,33 +97,265 @@ highway_analyzer = HighwayAnalyzer()
 
 industrial_analyzer = IndustrialAnalyzer()
 
-# -----------------------------------------------------------------------------
-# Scene → Source mapping
-# -----------------------------------------------------------------------------
-
-SCENE_SOURCES = {
-    "shibuya": {
-        "type": "youtube",
-        "url": "https://www.youtube.com/watch?v=dfVK7ld38Ys"
-    },
-    "industrial": {
-        "type": "file",
-        "url": "assets/industrial_demo.mp4"
-    },
-    "highway": {
-        "type": "file",
-        "url": "assets/highway_demo.mp4"
-    }
-}
+# Scene → Source mapping lives in scenes.py, shared with the backend.
 
 # =============================================================================
 # HELPERS
 # =============================================================================
 
-def resolve_stream(scene_key: str) -> str | None:
+def pack_payload(payload: dict):
+    """
+    Serialize a detection payload for transport: msgpack when available
+    (binary floats, smaller on the wire), JSON otherwise — via orjson
+    (C implementation, numpy-aware) when installed, stdlib json failing
+    that. Returns (body, content_type).
+    """
+    if msgpack is not None:
+        return msgpack.packb(payload, use_bin_type=True), "application/msgpack"
+    if orjson is not None:
+        body = orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+        return body, "application/json"
+    return json.dumps(payload), "application/json"
+
+
+class BackendLink:
+    """
+    Pushes per-frame data to the backend over persistent WebSockets
+    (one connection per channel instead of one HTTP request per frame).
+    Falls back to plain POST whenever a socket is down, and reconnects
+    lazily on the next send.
+    """
+
+    def __init__(self):
+        self._frame_ws = None
+        self._video_ws = None
+
+    def _connect(self, attr: str, url: str):
+        ws = getattr(self, attr)
+        if ws is None:
+            try:
+                ws = ws_connect(url, open_timeout=1, close_timeout=1)
+            except Exception:
+                ws = None
+            setattr(self, attr, ws)
+        return ws
+
+    def _drop(self, attr: str):
+        ws = getattr(self, attr)
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        setattr(self, attr, None)
+
+    def send_frame(self, body, content_type: str):
+        ws = self._connect("_frame_ws", WS_FRAME_ENDPOINT)
+        if ws is not None:
+            try:
+                ws.send(body)
+                return
+            except Exception:
+                self._drop("_frame_ws")
+
+        try:
+            SESSION.post(
+                FRAME_ENDPOINT,
+                data=body,
+                headers={"Content-Type": content_type},
+                timeout=1,
+            )
+        except Exception:
+            pass
+
+    def send_video(self, jpeg_bytes):
+        ws = self._connect("_video_ws", WS_VIDEO_ENDPOINT)
+        if ws is not None:
+            try:
+                ws.send(jpeg_bytes)
+                return
+            except Exception:
+                self._drop("_video_ws")
+
+        try:
+            SESSION.post(VIDEO_ENDPOINT, data=jpeg_bytes, timeout=1)
+        except Exception:
+            pass
+
+
+backend_link = BackendLink()
+
+# Upload stage runs on its own thread so the inference loop never blocks on
+# the network. The queue is deliberately tiny: when the uploader falls
+# behind, the oldest pending frame is dropped — for a live feed freshness
+# matters more than delivery.
+UPLOAD_QUEUE: queue.Queue = queue.Queue(maxsize=2)
+
+
+def enqueue_upload(item):
+    while True:
+        try:
+            UPLOAD_QUEUE.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                UPLOAD_QUEUE.get_nowait()  # drop oldest, keep the feed live
+            except queue.Empty:
+                pass
+
+
+# Scratch buffer for the dashboard resize — cv2.resize writes into it in
+# place, saving a ~1.5 MB allocation per frame. Only the upload worker
+# touches it, one frame at a time.
+_RESIZE_BUF = np.empty((VIDEO_SIZE[1], VIDEO_SIZE[0], 3), dtype=np.uint8)
+
+
+def encode_video_frame(frame):
+    """
+    Resize to dashboard size and JPEG-encode. Returns a buffer view of
+    the encoded bytes, or None if encoding failed.
+    """
+    # JPEG cost is O(pixels): shrink full-HD frames to what the
+    # dashboard actually renders before paying for the DCT.
+    out_frame = frame
+    if frame.shape[1] > VIDEO_SIZE[0]:
+        out_frame = cv2.resize(
+            frame, VIDEO_SIZE, dst=_RESIZE_BUF, interpolation=cv2.INTER_AREA
+        )
+
+    if _turbo is not None:
+        return _turbo.encode(out_frame, quality=JPEG_QUALITY)
+
+    ok, jpeg = cv2.imencode(
+        ".jpg",
+        out_frame,
+        [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY]
+    )
+    # imencode already produced a contiguous byte buffer — hand its
+    # memoryview to the sender instead of copying it with .tobytes().
+    return jpeg.reshape(-1).data if ok else None
+
+
+def send_video_frame(frame):
+    try:
+        buf = encode_video_frame(frame)
+        if buf is not None:
+            backend_link.send_video(buf)
+    except Exception:
+        pass
+
+
+def upload_worker():
+    # The metadata and video sends are independent, so fire them
+    # concurrently — their round-trips overlap instead of adding up.
+    # JPEG encoding happens here too: imencode releases the GIL, so it
+    # genuinely overlaps the next model pass on the inference thread.
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        while True:
+            body, content_type, frame = UPLOAD_QUEUE.get()
+
+            jobs = [pool.submit(backend_link.send_frame, body, content_type)]
+            if frame is not None:
+                jobs.append(pool.submit(send_video_frame, frame))
+
+            for job in jobs:
+                job.result()
+
+
+# Resolved YouTube HLS URLs by scene: (url, resolved_at). Shelling out to
+# yt-dlp costs seconds, so repeated scene switches reuse the cached URL
+# until it ages past HLS_MAX_AGE.
+_RESOLVED_HLS: dict[str, tuple[str, float]] = {}
+
+
+# Detection dicts are pooled and overwritten in place — at 30 FPS with
+# dozens of boxes, building fresh 4-key dicts every frame is steady
+# allocator/GC pressure. Reuse is safe because the payload is serialized
+# (pack_payload) before the next frame touches the pool.
+DET_POOL: list[dict] = []
+
+
+def pooled_detection(i: int) -> dict:
+    while len(DET_POOL) <= i:
+        DET_POOL.append({
+            "class_id": 0,
+            "class_name": "",
+            "confidence": 0.0,
+            "bbox": [0.0, 0.0, 0.0, 0.0],
+        })
+    return DET_POOL[i]
+
+
+class FrameReader:
+    """
+    Pulls frames from a VideoCapture on its own thread into a one-slot
+    queue, so the network/decode latency of cap.read() overlaps the model
+    pass instead of preceding it. The slot always holds the newest frame;
+    when inference falls behind, older frames are dropped (consistent
+    with CAP_PROP_BUFFERSIZE=1).
+    """
+
+    def __init__(self, cap):
+        self._cap = cap
+        self._q = queue.Queue(maxsize=1)
+        self._failed = threading.Event()
+        self._stop = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            ret, frame = self._cap.read()
+            if not ret or frame is None:
+                self._failed.set()
+                break
+            while True:
+                try:
+                    self._q.put_nowait(frame)
+                    break
+                except queue.Full:
+                    try:
+                        self._q.get_nowait()  # drop the stale frame
+                    except queue.Empty:
+                        pass
+        self._cap.release()
+
+    def read(self, timeout: float = 1.0):
+        """
+        Newest available frame, or None if nothing arrived in time.
+        """
+        try:
+            return self._q.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    @property
+    def failed(self) -> bool:
+        return self._failed.is_set()
+
+    def release(self):
+        # The reader thread releases the capture itself once it notices
+        # the stop flag — releasing here could yank it mid-read.
+        self._stop.set()
+
+
+def load_model() -> YOLO:
+    """
+    Load the detector, preferring a TensorRT engine exported next to the
+    weights (e.g. `yolov8s.engine`, from
+    `yolo export model=yolov8s.pt format=engine half=True`) — the fastest
+    path on NVIDIA hardware. Falls back to the plain .pt weights.
+    """
+    engine = Path(MODEL_PATH).with_suffix(".engine")
+    if torch.cuda.is_available() and engine.exists():
+        print(f"⚡ Using TensorRT engine: {engine}")
+        return YOLO(str(engine))
+    return YOLO(MODEL_PATH)
+
+
+def resolve_stream(scene_key: str, force: bool = False) -> str | None:
     """
     Resolve a playable stream URL for the given scene.
-    YouTube streams are always resolved fresh.
+    YouTube URLs are cached with a TTL; pass force=True to re-resolve.
     """
     source = SCENE_SOURCES.get(scene_key)
 
@@ -72,6 +364,10 @@ def resolve_stream(scene_key: str) -> str | None:
         return None
 
     if source["type"] == "youtube":
+        cached = _RESOLVED_HLS.get(scene_key)
+        if not force and cached and time.monotonic() - cached[1] < HLS_MAX_AGE:
+            return cached[0]
+
         try:
             print("🔄 Resolving fresh YouTube HLS URL…")
             cmd = ["yt-dlp", "-f", "95", "-g", source["url"]]
@@ -80,7 +376,9 @@ def resolve_stream(scene_key: str) -> str | None:
                 stderr=subprocess.DEVNULL,
                 timeout=30
             )
-            return output.decode().strip()
+            url = output.decode().strip()
+            _RESOLVED_HLS[scene_key] = (url, time.monotonic())
+            return url
         except subprocess.TimeoutExpired:
             print(f"⏱️ yt-dlp timed out while resolving stream for {scene_key}")
             return None
@@ -91,44 +389,116 @@ def resolve_stream(scene_key: str) -> str | None:
     return source["url"]
 
 
+# Last ETag seen from /scene — sent back as If-None-Match so unchanged
+# polls come back as an empty 304.
+_SCENE_ETAG: str | None = None
+
+
 def get_active_scene() -> str | None:
     """
-    Ask backend which scene is active.
+    Ask backend which scene is active. Returns None when the backend is
+    unreachable or reports the state unchanged (304).
     """
+    global _SCENE_ETAG
+    headers = {"If-None-Match": _SCENE_ETAG} if _SCENE_ETAG else None
     try:
-        r = requests.get(SCENE_ENDPOINT, timeout=2)
+        r = SESSION.get(SCENE_ENDPOINT, headers=headers, timeout=2)
+        if r.status_code == 304:
+            return None  # caller keeps its current scene
+        _SCENE_ETAG = r.headers.get("ETag")
         return r.json().get("scene")
     except Exception:
         return None
 
 
-def _centroid(b):
-    x1, y1, x2, y2 = b
-    return (x1 + x2) / 2.0, (y1 + y2) / 2.0
+class SceneWatcher:
+    """
+    Tracks the backend's active scene without polling from the hot loop.
+    A daemon thread holds the /scene/stream SSE connection so switches
+    arrive as pushes; if the stream drops it falls back to one /scene
+    poll before reconnecting.
+    """
+
+    def __init__(self):
+        self.scene: str | None = None
+        # Assume a viewer until the backend says otherwise, so video
+        # flows immediately on startup.
+        self.video_clients = 1
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _apply(self, data: str):
+        try:
+            state = json.loads(data)
+        except ValueError:
+            self.scene = data  # older backends send the bare scene name
+            return
+        self.scene = state.get("scene")
+        self.video_clients = int(state.get("video_clients", 1))
+
+    def _run(self):
+        while True:
+            try:
+                with SESSION.get(
+                    SCENE_STREAM_ENDPOINT, stream=True, timeout=(2, 30)
+                ) as r:
+                    for line in r.iter_lines(decode_unicode=True):
+                        if line and line.startswith("data:"):
+                            self._apply(line[5:].strip())
+            except Exception:
+                pass
+
+            scene = get_active_scene()
+            if scene:
+                self.scene = scene
+            time.sleep(POLL_INTERVAL)
+
+
+scene_watcher = SceneWatcher()
+
+
+def _phash(frame) -> int:
+    """
+    64-bit mean-threshold hash of an 8x8 grayscale thumbnail — costs well
+    under a millisecond, versus a full model pass for a duplicate frame.
+    """
+    g = cv2.cvtColor(
+        cv2.resize(frame, (8, 8), interpolation=cv2.INTER_AREA),
+        cv2.COLOR_BGR2GRAY,
+    )
+    bits = (g > g.mean()).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
 
 
-def _near_miss(person_dets, car_dets, px_threshold=70.0):
+def _near_miss(person_centers, person_conf, vehicle_centers, vehicle_conf,
+               px_threshold=70.0):
     """
     Lightweight 'unsafe interaction' for Shibuya:
     - If a car centroid is within N pixels of a person centroid -> flag.
     This is NOT a true collision predictor; it’s a demo-safe heuristic.
+
+    Takes (N,2) center arrays and matching confidence arrays sliced from
+    the frame's detection tensors — no dict lists, no re-filtering.
     """
-    alerts = []
-    for p in person_dets:
-        pc = _centroid(p["bbox"])
-        for c in car_dets:
-            cc = _centroid(c["bbox"])
-            dx = pc[0] - cc[0]
-            dy = pc[1] - cc[1]
-            dist = (dx * dx + dy * dy) ** 0.5
-            if dist < px_threshold:
-                alerts.append({
-                    "type": "pedestrian_vehicle_conflict",
-                    "distance_px": round(dist, 1),
-                    "person_conf": round(float(p["confidence"]), 2),
-                    "vehicle_conf": round(float(c["confidence"]), 2),
-                })
-    return alerts
+    if len(person_centers) == 0 or len(vehicle_centers) == 0:
+        return []
+
+    # All pairwise squared distances in one broadcast; comparing against the
+    # squared threshold skips the sqrt for every non-hit pair.
+    d2 = (
+        (person_centers[:, None, :] - vehicle_centers[None, :, :]) ** 2
+    ).sum(-1)
+
+    return [
+        {
+            "type": "pedestrian_vehicle_conflict",
+            "distance_px": round(float(d2[i, j]) ** 0.5, 1),
+            "person_conf": round(float(person_conf[i]), 2),
+            "vehicle_conf": round(float(vehicle_conf[j]), 2),
+        }
+        for i, j in np.argwhere(d2 < px_threshold * px_threshold)
+    ]
 
 
 # =============================================================================
@@ -137,98 +507,197 @@ def _near_miss(person_dets, car_dets, px_threshold=70.0):
 
 def main():
     print("🚀 Loading YOLO model…")
-    model = YOLO(MODEL_PATH)
+    model = load_model()
+
+    # model.names is a dict keyed by class id — freeze it into a tuple once
+    # so per-box label lookups are plain sequence indexing.
+    names = tuple(model.names[i] for i in range(len(model.names)))
+
+    # Resolve the class ids we filter on once, at startup — the hot loop
+    # then compares ints (and np.isin against a tiny id array) instead of
+    # strings per detection per frame.
+    name_to_id = {name: i for i, name in enumerate(names)}
+    person_id = name_to_id.get("person", -1)
+    vehicle_ids = np.array(
+        sorted(
+            name_to_id[n]
+            for n in ("car", "truck", "bus", "motorcycle")
+            if n in name_to_id
+        ),
+        dtype=np.int32,
+    )
+
+    threading.Thread(target=upload_worker, daemon=True).start()
+    scene_watcher.start()
 
     active_scene = None
-    cap = None
+    reader = None
 
     current_stream_url = None
     stream_resolved_at = 0
 
-    last_scene_poll = 0
+    # Open/read failures in a row. The first reconnect reuses the cached
+    # HLS URL (ffmpeg restart only — cheap); once failures repeat, the
+    # URL itself is presumed dead (expired/403) and re-resolved.
+    consecutive_failures = 0
+
+    last_frame_hash = 0
+    last_detections = None
+    last_class_counts = None
 
     while True:
-        now = time.time()
+        # One clock read of each kind per iteration — everything below
+        # reuses these instead of its own syscall. Monotonic drives
+        # intervals (HLS expiry) so NTP jumps can't fire or starve them;
+        # wall-clock is kept only where the value leaves the process.
+        now_wall = time.time()
+        now_mono = time.monotonic()
 
         # ---------------------------------------------------------------------
-        # Poll backend for scene changes
+        # React to scene changes (pushed via SSE — checking is just an
+        # attribute read, so it runs every iteration)
         # ---------------------------------------------------------------------
-        if now - last_scene_poll > POLL_INTERVAL:
-            scene = get_active_scene()
-            last_scene_poll = now
-
-            scene_changed = scene and scene != active_scene
-            hls_expired = (
-                current_stream_url
-                and (time.time() - stream_resolved_at > HLS_MAX_AGE)
+        scene = scene_watcher.scene
+
+        scene_changed = scene and scene != active_scene
+        hls_expired = (
+            current_stream_url
+            and (now_mono - stream_resolved_at > HLS_MAX_AGE)
+        )
+        needs_reconnect = scene and reader is None and active_scene is not None
+
+        if scene_changed or hls_expired or needs_reconnect:
+            if scene_changed:
+                print(f"🔁 Switching scene → {scene}")
+            elif hls_expired:
+                print("⏳ HLS URL expired — refreshing")
+
+            if reader:
+                reader.release()
+                reader = None
+
+            # A single failure gets a retry on the cached URL; repeated
+            # ones mean the URL itself went bad, so re-resolve it.
+            stream_url = resolve_stream(
+                scene,
+                force=bool(hls_expired) or consecutive_failures >= 2,
             )
-
-            if scene_changed or hls_expired:
-                if scene_changed:
-                    print(f"🔁 Switching scene → {scene}")
-                elif hls_expired:
-                    print("⏳ HLS URL expired — refreshing")
-
-                if cap:
-                    cap.release()
-                    cap = None
-
-                stream_url = resolve_stream(scene)
-                if not stream_url:
-                    print("⚠️ No valid stream URL — retrying")
-                    time.sleep(1)
-                    continue
-
-                cap = cv2.VideoCapture(stream_url)
-                if not cap.isOpened():
-                    print("❌ OpenCV failed to open stream")
-                    cap.release()
-                    cap = None
-                    time.sleep(1)
-                    continue
-
-                active_scene = scene
-                current_stream_url = stream_url
-                stream_resolved_at = time.time()
-
-        if cap is None:
+            if not stream_url:
+                print("⚠️ No valid stream URL — retrying")
+                time.sleep(1)
+                continue
+
+            # Timeouts must be passed at open time; they make a dead stream
+            # fail fast into the reconnect path instead of hanging a read.
+            # VIDEO_ACCELERATION_ANY asks FFmpeg for a hardware decoder
+            # (NVDEC/VAAPI/whatever the host has) and silently falls back
+            # to software when none is available.
+            cap = cv2.VideoCapture(
+                stream_url,
+                cv2.CAP_FFMPEG,
+                [
+                    cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY,
+                    cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, 10000,
+                    cv2.CAP_PROP_READ_TIMEOUT_MSEC, 5000,
+                ],
+            )
+            if not cap.isOpened():
+                print("❌ OpenCV failed to open stream")
+                cap.release()
+                cap = None
+                consecutive_failures += 1
+                time.sleep(1)
+                continue
+
+            # A deep driver buffer hands out stale frames whenever inference
+            # runs slower than the stream; depth 1 keeps reads at the live
+            # edge.
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+            reader = FrameReader(cap)
+            active_scene = scene
+            current_stream_url = stream_url
+            # Fresh read, not now_mono — resolving can take seconds.
+            stream_resolved_at = time.monotonic()
+            last_detections = None  # never reuse detections across scenes
+
+        if reader is None:
             time.sleep(0.2)
             continue
 
         # ---------------------------------------------------------------------
-        # Read frame
+        # Read frame (produced by the capture thread)
         # ---------------------------------------------------------------------
-        ret, frame = cap.read()
-        if not ret or frame is None:
-            print("⚠️ Frame read failed — forcing reconnect")
-            cap.release()
-            cap = None
-            current_stream_url = None
-            time.sleep(0.5)
+        frame = reader.read(timeout=1.0)
+        if frame is None:
+            if reader.failed:
+                print("⚠️ Frame read failed — forcing reconnect")
+                reader.release()
+                reader = None
+                consecutive_failures += 1
+                time.sleep(0.5)
             continue
 
+        if consecutive_failures:
+            consecutive_failures = 0  # stream delivered — URL is healthy
+
         # ---------------------------------------------------------------------
-        # Inference
+        # Inference — skipped when the frame is perceptually identical to
+        # the previous one (stalled HLS segments repeat frames verbatim)
         # ---------------------------------------------------------------------
-        results = model(frame, conf=0.15, verbose=False)[0]
-
-        detections = []
-        class_counts = {}
-
-        for box in results.boxes:
-            cls_id = int(box.cls[0])
-            conf = float(box.conf[0])
-            x1, y1, x2, y2 = map(float, box.xyxy[0])
-
-            cls_name = model.names[cls_id]
-            class_counts[cls_name] = class_counts.get(cls_name, 0) + 1
+        frame_hash = _phash(frame)
+        static_frame = (
+            last_detections is not None
+            and (frame_hash ^ last_frame_hash).bit_count() <= PHASH_HAMMING_MAX
+        )
+        last_frame_hash = frame_hash
+
+        if static_frame:
+            detections = last_detections
+            class_counts = last_class_counts
+        else:
+            results = model(
+                frame,
+                conf=0.15,
+                verbose=False,
+                half=USE_HALF,
+                device=DEVICE,
+                imgsz=IMGSZ,
+            )[0]
+
+            # Pull all box tensors to the CPU once — indexing
+            # box.cls/.conf/.xyxy per detection forces a device sync per
+            # scalar.
+            boxes = results.boxes
+            cls = boxes.cls.cpu().numpy().astype(np.int32)
+            conf = boxes.conf.cpu().numpy()
+            xyxy = boxes.xyxy.cpu().numpy()
+
+            # One bulk tolist() per array converts everything to native
+            # Python scalars up front — no per-box numpy indexing or casts.
+            cls_list = cls.tolist()
+            conf_list = conf.tolist()
+            xyxy_list = xyxy.tolist()
+
+            detections = []
+            for i, cid in enumerate(cls_list):
+                d = pooled_detection(i)
+                d["class_id"] = cid
+                d["class_name"] = names[cid]
+                d["confidence"] = conf_list[i]
+                bb = d["bbox"]
+                bb[0], bb[1], bb[2], bb[3] = xyxy_list[i]
+                detections.append(d)
+
+            # bincount on the already-extracted id array, then materialize
+            # only the classes that actually appeared
+            counts = np.bincount(cls, minlength=len(names))
+            class_counts = {
+                names[i]: n for i, n in enumerate(counts.tolist()) if n
+            }
 
-            detections.append({
-                "class_id": cls_id,
-                "class_name": cls_name,
-                "confidence": conf,
-                "bbox": [x1, y1, x2, y2]
-            })
+        last_detections = detections
+        last_class_counts = class_counts
 
         # ---------------------------------------------------------------------
         # Scene-specific intelligence
@@ -240,18 +709,21 @@ def main():
             _, frame_width = frame.shape[:2]
 
             crowd_intel = crowd_analyzer.analyze(detections, frame_width)
-            loiter_intel = loiter_analyzer.analyze(detections, now=time.time())
-
-            persons = [
-                d for d in detections
-                if d["class_name"] == "person" and float(d["confidence"]) > 0.15
-            ]
-            vehicles = [
-                d for d in detections
-                if d["class_name"] in ("car", "truck", "bus", "motorcycle")
-            ]
-
-            conflict_alerts = _near_miss(persons, vehicles, px_threshold=70.0)
+            loiter_intel = loiter_analyzer.analyze(detections, now=now_wall)
+
+            # Work straight on the frame's detection arrays: one centers
+            # computation, id-based boolean masks for the two groups.
+            centers = (xyxy[:, :2] + xyxy[:, 2:]) * 0.5
+            person_mask = (cls == person_id) & (conf > 0.15)
+            vehicle_mask = np.isin(cls, vehicle_ids)
+
+            conflict_alerts = _near_miss(
+                centers[person_mask],
+                conf[person_mask],
+                centers[vehicle_mask],
+                conf[vehicle_mask],
+                px_threshold=70.0,
+            )
 
             intelligence["crowd"] = crowd_intel
             intelligence["loitering"] = loiter_intel
@@ -281,45 +753,52 @@ def main():
 
         payload = {
             "scene": active_scene,
-            "timestamp": time.time(),
+            "timestamp": now_wall,
             "num_detections": len(detections),
             "classes": class_counts,
             "detections": detections,
             "intelligence": intelligence
         }
 
-        try:
-            requests.post(FRAME_ENDPOINT, json=payload, timeout=1)
-        except Exception:
-            pass
-
         # ---------------------------------------------------------------------
         # Draw + send frame
         # ---------------------------------------------------------------------
-        for d in detections:
-            x1, y1, x2, y2 = map(int, d["bbox"])
-            label = f"{d['class_name']} {d['confidence']:.2f}"
-
-            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 200, 0), 2)
-            cv2.putText(
-                frame,
-                label,
-                (x1, y1 - 5),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                (0, 200, 0),
-                1
-            )
-
-        try:
-            _, jpeg = cv2.imencode(
-                ".jpg",
-                frame,
-                [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY]
-            )
-            requests.post(VIDEO_ENDPOINT, data=jpeg.tobytes(), timeout=1)
-        except Exception:
-            pass
+        # Draw every box with one polylines call — one Python→C transition
+        # per frame instead of one cv2.rectangle call per detection. Text
+        # can't be batched, so labels stay per-box but are dropped on very
+        # busy frames.
+        if detections:
+            # (N,4,2) corner array assembled by column slicing — no
+            # per-box Python work; xyxy always matches `detections`,
+            # including on reused static frames.
+            rects = np.stack(
+                [xyxy[:, [0, 1]], xyxy[:, [2, 1]],
+                 xyxy[:, [2, 3]], xyxy[:, [0, 3]]],
+                axis=1,
+            ).astype(np.int32)
+            cv2.polylines(frame, rects, True, BOX_COLOR, 2)
+
+            if len(detections) <= MAX_LABELED_DETECTIONS:
+                for d in detections:
+                    x1, y1 = int(d["bbox"][0]), int(d["bbox"][1])
+                    label = f"{d['class_name']} {d['confidence']:.2f}"
+                    cv2.putText(
+                        frame,
+                        label,
+                        (x1, y1 - 5),
+                        cv2.FONT_HERSHEY_SIMPLEX,
+                        0.5,
+                        BOX_COLOR,
+                        1
+                    )
+
+        # Encoding and sending happen on the upload worker; the annotated
+        # frame is handed over as-is (cap.read produces a fresh array each
+        # iteration, so nothing mutates it once enqueued). When nobody is
+        # watching the MJPEG stream, skip the video path entirely.
+        body, content_type = pack_payload(payload)
+        out = frame if scene_watcher.video_clients > 0 else None
+        enqueue_upload((body, content_type, out))
 
 
 if __name__ == "__main__":
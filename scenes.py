@@ -0,0 +1,37 @@
+"""
+Authoritative scene registry, shared by the backend and the inference
+node so the two can never drift out of sync.
+
+SCENES is what the backend exposes to the dashboard; SCENE_SOURCES is
+what the inference node opens for each scene.
+"""
+
+SCENES = {
+    "shibuya": {
+        "label": "Shibuya Crossing",
+        "type": "youtube",
+    },
+    "industrial": {
+        "label": "Industrial Yard",
+        "type": "hls",
+    },
+    "highway": {
+        "label": "Highway Traffic",
+        "type": "hls",
+    },
+}
+
+SCENE_SOURCES = {
+    "shibuya": {
+        "type": "youtube",
+        "url": "https://www.youtube.com/watch?v=dfVK7ld38Ys"
+    },
+    "industrial": {
+        "type": "file",
+        "url": "assets/industrial_demo.mp4"
+    },
+    "highway": {
+        "type": "file",
+        "url": "assets/highway_demo.mp4"
+    }
+}